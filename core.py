@@ -0,0 +1,678 @@
+import streamlit as st
+import openai
+import httpx
+import asyncio
+import threading
+import json
+import hashlib
+import re
+import functools
+import contextlib
+import diskcache
+from dataclasses import dataclass
+from typing import Literal, get_args
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError, create_model
+
+# Maximum number of GPT calls in flight at once, to stay under the rate limit
+MAX_CONCURRENT_GPT_CALLS = 32
+
+# Chat completion settings shared by every GPT request, live or batch
+GPT_PARAMS = {
+    "model": "gpt-4o-mini",
+    "temperature": 0,
+    "seed": 94032,
+}
+
+# Validated suggestions persisted on disk, so the cache survives restarts and deploys
+_SUGGESTION_CACHE = diskcache.Cache("./.suggestion_cache", size_limit=64 << 20)
+
+# Seconds a persisted suggestion stays valid
+SUGGESTION_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Seconds between status checks while an offline batch is running
+BATCH_POLL_INTERVAL = 30
+
+# Create the OpenAI client once per server process, shared by every rerun and session
+# (HTTP/2 keep-alive pool, so concurrent calls share warm connections instead of new TLS handshakes)
+@st.cache_resource
+def get_client():
+    return openai.AsyncOpenAI(
+        api_key=st.secrets["key"],
+        http_client=httpx.AsyncClient(http2=True, limits=httpx.Limits(max_keepalive_connections=MAX_CONCURRENT_GPT_CALLS))
+    )
+
+# Background event loop plus the GPT concurrency limit used on it, created together so a cleared
+# resource cache can never pair a new loop with a semaphore bound to the old one
+@dataclass
+class SharedLoop:
+    loop: asyncio.AbstractEventLoop
+    gpt_semaphore: asyncio.Semaphore
+
+# Start one background event loop for all GPT calls, shared by every session
+# (the client's connection pool is tied to a single loop, so asyncio.run per call can't reuse it)
+@st.cache_resource
+def get_shared_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return SharedLoop(loop=loop, gpt_semaphore=asyncio.Semaphore(MAX_CONCURRENT_GPT_CALLS))
+
+# Run a coroutine on the shared event loop and wait for its result
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_shared_loop().loop).result()
+
+# Iterate an async generator from the script thread, one item at a time on the shared loop
+# (closed even when the caller stops early, e.g. on a rerun, so its semaphore slot and HTTP stream are released)
+def iter_async(agen):
+    async def next_item():
+        try:
+            return await agen.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    try:
+        while (item := run_async(next_item())) is not None:
+            yield item
+    finally:
+        run_async(agen.aclose())
+
+# Unit multipliers and pattern for parse_number_input, built once at import
+_NUMBER_MAP = {
+    "k": 1_000, "thousand": 1_000,
+    "m": 1_000_000, "million": 1_000_000,
+    "b": 1_000_000_000, "billion": 1_000_000_000
+}
+_NUM_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([a-z]+)?")
+
+# Parse human-readable numbers (e.g., "20 million" → 20000000)
+@functools.lru_cache(maxsize=512)
+def parse_number_input(input_text):
+    input_text = input_text.lower().replace(",", "").strip()
+    match = _NUM_RE.match(input_text)
+    if match:
+        num, unit = match.groups()
+        num = float(num)
+        multiplier = _NUMBER_MAP.get(unit, 1)
+        return int(num * multiplier)
+    return None
+
+# Parse several human-readable numbers in one pass (unparseable inputs become 0)
+def parse_numbers_batch(texts):
+    return [parse_number_input(text) or 0 for text in texts]
+
+# Dataset configuration fields as (refresh_details key, input label), in the order they are shown
+DATASET_FIELDS = (
+    ("historical_load", "Historical Load (e.g., '20 million'):"),
+    ("monthly_increase", "Monthly Increase (e.g., '50 thousand'):"),
+    ("datasets", "Number of Datasets:"),
+    ("daily_refresh", "Daily Refresh Datasets:"),
+    ("three_hour_refresh", "3-Hour Refresh Datasets:"),
+    ("hourly_refresh", "Hourly Refresh Datasets:"),
+    ("real_time_refresh", "15-Min Refresh Datasets:"),
+)
+
+# Render the dataset configuration text inputs and return their raw values, in DATASET_FIELDS order
+def dataset_config_inputs(defaults=None):
+    defaults = defaults or ("",) * len(DATASET_FIELDS)
+    return [st.text_input(label, default) for (_, label), default in zip(DATASET_FIELDS, defaults)]
+
+# Turn raw dataset configuration inputs into refresh_details (unparseable inputs become 0)
+def build_refresh_details(config_inputs):
+    return dict(zip((key for key, _ in DATASET_FIELDS), parse_numbers_batch(config_inputs)))
+
+# Render the Step 1-3 input form; returns (submitted, data_sources, custom_requirement, config_inputs)
+def dataset_config_form(data_source_options, submit_label):
+    with st.form("input_form"):
+        st.header("Step 1: Select Data Sources")
+        data_sources = st.multiselect(
+            "Select Data Sources:",
+            options=data_source_options,
+        )
+
+        st.header("Step 2: Describe Custom Requirement")
+        custom_requirement = st.text_area(
+            "Describe your custom requirement:",
+            placeholder="Example: Need a scalable solution for real-time data ingestion and visualization.",
+            height=150
+        )
+
+        st.header("Step 3: Input Dataset Configuration")
+        config_inputs = dataset_config_inputs()
+
+        submitted = st.form_submit_button(submit_label)
+    return submitted, data_sources, custom_requirement, config_inputs
+
+# Check the dataset configuration inputs, so no GPT call is spent on fields that are empty or not numbers;
+# returns the error to show, or None when every field parses
+def validate_config_inputs(config_inputs):
+    if not all(config_inputs):
+        return "❌ Please fill out all dataset configuration fields."
+    if any(parse_number_input(value) is None for value in config_inputs):
+        return "❌ Please enter a valid number for every dataset configuration field."
+    return None
+
+# Check a submitted form; returns the error to show, or None when every step is filled in
+def validate_config_form(data_sources, custom_requirement, config_inputs):
+    if not data_sources:
+        return "❌ Please select at least one data source."
+    if not custom_requirement.strip():
+        return "❌ Please describe your custom requirement."
+    return validate_config_inputs(config_inputs)
+
+# Tool cost estimates (optional predefined ones)
+TOOL_COSTS = {
+    "Domo": {"Small": 500, "Medium": 2000, "Large": 5000},
+    "Power BI": {"Small": 200, "Medium": 1000, "Large": 3000},
+    "Sigma": {"Small": 300, "Medium": 1500, "Large": 4000},
+    "dbt": {"Small": 100, "Medium": 500, "Large": 2000},
+    "Snowflake": {"Small": 300, "Medium": 2000, "Large": 8000},
+    "Databricks": {"Small": 500, "Medium": 2500, "Large": 9000},
+    "ADF": {"Small": 100, "Medium": 800, "Large": 2500},
+    "Tableau": {"Small": 300, "Medium": 1500, "Large": 4500},
+    "Kafka": {"Small": 400, "Medium": 1500, "Large": 5000},
+    "Fivetran": {"Small": 300, "Medium": 1200, "Large": 4000},
+    "Airbyte": {"Small": 200, "Medium": 800, "Large": 3000},
+}
+
+# Tools the "restricted" prompt may pick from; replies naming anything else are rejected
+ToolName = Literal["Domo", "Power BI", "Sigma", "dbt", "Snowflake", "Databricks", "ADF", "Tableau"]
+ALLOWED_TOOLS = frozenset(get_args(ToolName))
+
+# Tool costs as a tool x tier frame, built once so estimates are a single vectorized lookup
+# (object dtype keeps the dollar amounts as ints when missing tools are filled in; pandas is
+# imported on first use, so apps without a cost table never pay for it)
+@functools.cache
+def _cost_frame():
+    import pandas as pd
+    return pd.DataFrame(TOOL_COSTS, dtype=object).T
+
+# Usage tiers, requested together in a single GPT call by the "tiered" prompt
+USAGE_TIERS = ("Small", "Medium", "Large")
+
+# Reply schemas per prompt variant, flat so GPT emits as few output tokens as possible;
+# validating the raw arguments text parses and checks it in one pass
+class ToolPlan(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    ingestion: str
+    transformation: str
+    visualization: str
+
+class AllowedToolPlan(ToolPlan):
+    ingestion: ToolName
+    transformation: ToolName
+    visualization: ToolName
+
+class TieredToolPlan(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    Small: ToolPlan
+    Medium: ToolPlan
+    Large: ToolPlan
+
+PLAN_MODELS = {"restricted": AllowedToolPlan, "open": ToolPlan, "tiered": TieredToolPlan}
+
+# Forced submit_architecture function per variant (strict structured output, so the schema never goes in the prompt)
+PLAN_TOOLS = {
+    variant: {
+        "type": "function",
+        "function": {"name": "submit_architecture", "strict": True, "parameters": model.model_json_schema()},
+    }
+    for variant, model in PLAN_MODELS.items()
+}
+PLAN_TOOL_CHOICE = {"type": "function", "function": {"name": "submit_architecture"}}
+
+# Expand a flat plan into the {"category": {"tool": ...}} shape the flowcharts and cost table use
+def _nest_plan(plan):
+    return {category: {"tool": tool} for category, tool in plan.items()}
+
+# Validate submit_architecture arguments and return them in the nested plan shape
+def parse_plan(arguments_json, variant):
+    plan = PLAN_MODELS[variant].model_validate_json(arguments_json).model_dump()
+    if variant == "tiered":
+        return {tier: _nest_plan(tier_plan) for tier, tier_plan in plan.items()}
+    return _nest_plan(plan)
+
+# System prompts per app variant: "restricted" picks from a fixed tool list, "open" allows any tool,
+# "tiered" answers for every usage tier at once. Per-request data stays in one compact user line.
+_INPUT_LEGEND = (
+    "Input: sources; hist/mo=historical/monthly new rows, rounded down to a power of ten; ds=datasets; "
+    "d/3h/h/rt=datasets refreshed daily/every 3 hours/hourly/every 15 minutes; req=custom requirement. "
+)
+SYSTEM_PROMPTS = {
+    "restricted": (
+        "You are a cloud architecture expert. Pick one low-cost, high-performance tool each for ingestion, "
+        "transformation and visualization, strictly from: " + ", ".join(sorted(ALLOWED_TOOLS)) + ". "
+        + _INPUT_LEGEND + "Submit the plan with submit_architecture."
+    ),
+    "open": (
+        "You are a cloud architecture expert. Suggest the best ingestion, transformation and visualization tools; "
+        "any scalable, industry-standard, cost-effective tool is allowed. "
+        + _INPUT_LEGEND + "Submit the plan with submit_architecture."
+    ),
+    "tiered": (
+        "You are a cloud architecture expert. For each usage tier (" + ", ".join(USAGE_TIERS) + ") suggest the best "
+        "ingestion, transformation and visualization tools; any scalable, industry-standard, cost-effective tool is allowed. "
+        + _INPUT_LEGEND + "Submit one plan per tier with submit_architecture."
+    ),
+}
+
+# Output token budget per prompt variant (~25 tokens per flat tool plan)
+MAX_TOKENS = {"restricted": 80, "open": 80, "tiered": 200}
+
+# Version of the persisted suggestions: changing the model, the prompts or the reply schema starts a fresh key space
+_SUGGESTION_CACHE_VERSION = hashlib.sha256(
+    json.dumps([GPT_PARAMS, SYSTEM_PROMPTS, PLAN_TOOLS], sort_keys=True).encode()
+).hexdigest()[:16]
+
+# Row-volume fields that GPT and the cache key only see by order of magnitude
+_BUCKETED_FIELDS = ("historical_load", "monthly_increase")
+
+# Round a row count down to its power of ten (18 million and 22 million both become 10 million)
+def bucket_rows(n):
+    return 0 if n <= 0 else 10 ** (len(str(int(n))) - 1)
+
+# Canonical form of a data source selection: sorted and deduped, so order and repeats never change a cache key or the graph
+def canonical_sources(data_sources):
+    return tuple(sorted(set(data_sources)))
+
+# Build the canonical JSON payload used as the GPT cache key
+# (row volumes are bucketed here only; the entered values are left untouched for display)
+def build_payload(data_sources, refresh_details, custom_requirement="", variant="open"):
+    refresh = {key: bucket_rows(value) if key in _BUCKETED_FIELDS else value for key, value in refresh_details.items()}
+    return json.dumps(
+        {"sources": canonical_sources(data_sources), "refresh": refresh, "custom": custom_requirement, "variant": variant},
+        sort_keys=True
+    )
+
+# Hash a canonical payload, so an unchanged resubmission can skip GPT entirely
+def hash_payload(payload_json):
+    return hashlib.blake2b(payload_json.encode(), digest_size=16).hexdigest()
+
+# Reuse the last result when the inputs have not changed since the previous click; otherwise
+# call generate and keep its result for the next click, unless it failed (falsy)
+def reuse_last_result(payload_json, generate):
+    payload_hash = hash_payload(payload_json)
+    if st.session_state.get("last_hash") == payload_hash:
+        return st.session_state["last_result"]
+
+    result = generate()
+    if result:
+        st.session_state["last_hash"] = payload_hash
+        st.session_state["last_result"] = result
+    return result
+
+# Build the chat completion request for one canonical JSON payload
+def build_request(payload_json):
+    payload = json.loads(payload_json)
+    refresh_details = payload["refresh"]
+    user_message = (
+        f"sources={','.join(payload['sources'])};hist={refresh_details['historical_load']};"
+        f"mo={refresh_details['monthly_increase']};ds={refresh_details['datasets']};"
+        f"d={refresh_details['daily_refresh']};3h={refresh_details['three_hour_refresh']};"
+        f"h={refresh_details['hourly_refresh']};rt={refresh_details['real_time_refresh']}"
+    )
+    if payload["custom"]:
+        user_message += f";req={payload['custom'][:200]}"
+    # The byte-identical system prompt leads and per-request data trails, so OpenAI's automatic
+    # prefix cache can reuse the static part across calls
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPTS[payload["variant"]]},
+        {"role": "user", "content": user_message}
+    ]
+    # A retry adds the validation errors of the rejected reply as a correction
+    if payload.get("correction"):
+        messages.append({"role": "user", "content": payload["correction"]})
+    return {
+        **GPT_PARAMS,
+        "max_tokens": MAX_TOKENS[payload["variant"]],
+        "messages": messages,
+        "tools": [PLAN_TOOLS[payload["variant"]]],
+        "tool_choice": PLAN_TOOL_CHOICE,
+        "parallel_tool_calls": False,
+    }
+
+# Stream the submit_architecture arguments for one canonical JSON payload as they are generated
+# (only the first tool call is collected, so a stray second call can't be spliced into its JSON)
+async def astream_tool_suggestions(client, payload_json, gpt_semaphore):
+    async with gpt_semaphore:
+        stream = await client.chat.completions.create(stream=True, **build_request(payload_json))
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            for tool_call in chunk.choices[0].delta.tool_calls or ():
+                if tool_call.index == 0 and tool_call.function and tool_call.function.arguments:
+                    yield tool_call.function.arguments
+
+# Call GPT and return the validated plan; an invalid reply raises ValidationError
+# (caching is left to get_tool_suggestions, whose disk cache is the only suggestion cache)
+def _gpt_call(client, payload_json):
+    # Show the reply while it streams in, then clear it once the JSON is complete
+    placeholder = st.empty()
+    chunks = []
+    gpt_semaphore = get_shared_loop().gpt_semaphore
+    with contextlib.closing(iter_async(astream_tool_suggestions(client, payload_json, gpt_semaphore))) as deltas:
+        for delta in deltas:
+            chunks.append(delta)
+            placeholder.code("".join(chunks), language="json")
+    placeholder.empty()
+    return parse_plan("".join(chunks), json.loads(payload_json)["variant"])
+
+# Historical load below which a batch-only workload gets a canned plan instead of a GPT call
+LOCAL_MAX_HISTORICAL_LOAD = 1_000_000
+
+# Data sources that need streaming ingestion, which the canned plans don't cover
+_STREAMING_SOURCES = frozenset({"Kafka Stream", "IoT Devices"})
+
+# Canned plan for small batch-only workloads, from ALLOWED_TOOLS. Only the "restricted" variant
+# (app.py/app2.py) has one: a custom requirement can ask for anything, so it always goes to GPT,
+# and app4 requires one; the "tiered" variant (app3) needs a distinct plan per tier.
+_LOCAL_PLANS = {
+    "restricted": {"ingestion": {"tool": "ADF"}, "transformation": {"tool": "dbt"}, "visualization": {"tool": "Power BI"}},
+}
+
+# Answer trivial workloads locally; None means the request needs GPT
+def classify_local(data_sources, refresh_details, custom_requirement, variant):
+    if (
+        variant in _LOCAL_PLANS
+        and not custom_requirement
+        and refresh_details["historical_load"] < LOCAL_MAX_HISTORICAL_LOAD
+        and not refresh_details["real_time_refresh"]
+        and _STREAMING_SOURCES.isdisjoint(data_sources)
+    ):
+        return _LOCAL_PLANS[variant]
+    return None
+
+# Disk cache key for one canonical payload under the current prompt/schema version
+def _suggestion_cache_key(payload_json):
+    return hashlib.sha256(f"{_SUGGESTION_CACHE_VERSION}:{payload_json}".encode()).hexdigest()
+
+# One line listing every validation error as "location: message"
+def _format_errors(e):
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+# Get validated tool suggestions (keyed by tier name for the "tiered" variant), from the canned plans,
+# the disk cache or GPT in that order; before_gpt is called only when GPT has to answer
+def get_tool_suggestions(client, data_sources, refresh_details, custom_requirement="", variant="open", before_gpt=None):
+    if (tool_suggestions := classify_local(data_sources, refresh_details, custom_requirement, variant)) is not None:
+        return tool_suggestions
+
+    payload_json = build_payload(data_sources, refresh_details, custom_requirement, variant)
+    cache_key = _suggestion_cache_key(payload_json)
+    if (tool_suggestions := _SUGGESTION_CACHE.get(cache_key)) is not None:
+        return tool_suggestions
+
+    if before_gpt:
+        before_gpt()
+
+    for _ in range(2):
+        try:
+            tool_suggestions = _gpt_call(client, payload_json)
+            _SUGGESTION_CACHE.set(cache_key, tool_suggestions, expire=SUGGESTION_CACHE_TTL)
+            return tool_suggestions
+        except ValidationError as e:
+            errors = _format_errors(e)
+
+        # Retry once, with the validation errors as the correction
+        payload_json = json.dumps({
+            **json.loads(payload_json),
+            "correction": f"Invalid plan ({errors}). Call submit_architecture again with valid arguments."
+        }, sort_keys=True)
+
+    st.error(f"❌ GPT returned an invalid response: {errors}")
+    return None
+
+# Submit payloads through the OpenAI Batch API (half the price of live calls) and wait for the results
+async def abatch_tool_suggestions(client, payload_jsons):
+    lines = [
+        json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": build_request(payload_json),
+        })
+        for i, payload_json in enumerate(payload_jsons)
+    ]
+
+    batch_file = await client.files.create(file=("scenarios.jsonl", "\n".join(lines).encode()), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+        batch = await client.batches.retrieve(batch.id)
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'.")
+    if not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} returned no results.")
+    output = await client.files.content(batch.output_file_id)
+
+    # Results come back in arbitrary order; failed or unparseable scenarios stay None
+    results = [None] * len(payload_jsons)
+    for line in output.text.splitlines():
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        index = int(record["custom_id"])
+        try:
+            arguments = response["body"]["choices"][0]["message"]["tool_calls"][0]["function"]["arguments"]
+            results[index] = parse_plan(arguments, json.loads(payload_jsons[index])["variant"])
+        except (KeyError, IndexError, TypeError, ValidationError):
+            pass
+    return results
+
+# Batch results are cached on the scenario payloads so a resubmitted batch is free
+@st.cache_data(show_spinner=False)
+def _batch_call(_client, payload_jsons):
+    return run_async(abatch_tool_suggestions(_client, payload_jsons))
+
+# Shape of one offline batch scenario; every dataset field is required, since build_request reads them all
+RefreshDetails = create_model("RefreshDetails", **{key: (int, ...) for key, _ in DATASET_FIELDS})
+
+class Scenario(BaseModel):
+    data_sources: list[str]
+    refresh_details: RefreshDetails
+    custom_requirement: str = ""
+
+_SCENARIOS = TypeAdapter(list[Scenario])
+
+# Generate tool suggestions for many scenarios offline
+# (the scenarios are validated before anything is uploaded; a malformed file raises ValueError)
+def batch_generate(client, scenarios, variant="tiered"):
+    try:
+        scenarios = _SCENARIOS.validate_python(scenarios)
+    except ValidationError as e:
+        raise ValueError(f"Invalid scenarios: {_format_errors(e)}") from None
+    if not scenarios:
+        raise ValueError("The scenarios file contains no scenarios.")
+
+    payload_jsons = tuple(
+        build_payload(s.data_sources, s.refresh_details.model_dump(), s.custom_requirement, variant)
+        for s in scenarios
+    )
+    return _batch_call(client, payload_jsons)
+
+# Estimate tool costs (cached, so flipping the usage tier back and forth is free)
+@st.cache_data(show_spinner=False)
+def estimate_tool_costs(tool_suggestions, usage_tier):
+    import pandas as pd
+    categories = list(tool_suggestions)
+    tools = [tool_suggestions[category]["tool"] for category in categories]
+    costs = _cost_frame()[usage_tier].reindex(tools)
+    return pd.DataFrame({
+        "Tool": tools,
+        "Category": [category.capitalize() for category in categories],
+        "Estimated Monthly Cost ($)": costs.where(costs.notna(), "Custom Pricing").values
+    })
+
+# DOT attributes shared by the flowcharts
+_GRAPH_ATTR = {'rankdir': 'LR'}
+_NODE_ATTR = {'shape': 'box'}
+_COMPLEX_NODE_ATTR = {'shape': 'box', 'style': 'rounded,filled', 'fillcolor': 'lightgrey'}
+
+# Quote a DOT string, turning newlines into DOT line breaks
+def _dot_quote(text):
+    return '"' + text.replace('"', '\\"').replace("\n", "\\n") + '"'
+
+# Format a DOT attribute list
+def _dot_attrs(attrs):
+    return "[" + " ".join(f"{key}={_dot_quote(value)}" for key, value in attrs.items()) + "]"
+
+# Format a DOT node statement
+def _dot_node(name, label, **attrs):
+    return f"{_dot_quote(name)} {_dot_attrs({'label': label, **attrs})}"
+
+# Format a DOT edge statement
+def _dot_edge(tail, head):
+    return f"{_dot_quote(tail)} -> {_dot_quote(head)}"
+
+# Assemble DOT source straight from node and edge statements, without building a Digraph
+def _dot_source(node_attr, statements):
+    lines = ["digraph {", f"\tgraph {_dot_attrs(_GRAPH_ATTR)}", f"\tnode {_dot_attrs(node_attr)}"]
+    lines += [f"\t{statement}" for statement in statements]
+    return "\n".join(lines) + "\n}\n"
+
+# Build the flowchart DOT source, once per unique plan
+@st.cache_data(max_entries=128, show_spinner=False)
+def build_dot(sources, ingestion_tool, transformation_tool, visualization_tool):
+    return _dot_source(_NODE_ATTR, [
+        _dot_node("Data Sources", "\n".join(sources)),
+        _dot_node("Ingestion", f"{ingestion_tool} (Ingestion)"),
+        _dot_node("Transformation", f"{transformation_tool} (Transformation)"),
+        _dot_node("Visualization", f"{visualization_tool} (Visualization)"),
+        _dot_edge("Data Sources", "Ingestion"),
+        _dot_edge("Ingestion", "Transformation"),
+        _dot_edge("Transformation", "Visualization"),
+    ])
+
+# Generate flowchart (cached on the canonical sources)
+def generate_flowchart(data_sources, tool_suggestions):
+    return build_dot(
+        canonical_sources(data_sources),
+        tool_suggestions['ingestion']['tool'],
+        tool_suggestions['transformation']['tool'],
+        tool_suggestions['visualization']['tool']
+    )
+
+# Outcome of generate_flowchart_and_json; callers branch on ok instead of inspecting the JSON text
+@dataclass
+class ToolResult:
+    ok: bool
+    json: str | None = None
+    graph: str | None = None
+
+    # A failed result is falsy, so it is never kept by reuse_last_result
+    def __bool__(self):
+        return self.ok
+
+# Generate the flowchart and JSON from tools picked off the fixed list
+def generate_flowchart_and_json(client, data_sources, refresh_details):
+    tool_suggestions = get_tool_suggestions(client, data_sources, refresh_details, variant="restricted")
+
+    # get_tool_suggestions has already shown why it failed
+    if not tool_suggestions:
+        return ToolResult(ok=False)
+
+    return ToolResult(
+        ok=True,
+        json=json.dumps(tool_suggestions, indent=4),
+        graph=generate_flowchart(data_sources, tool_suggestions)
+    )
+
+# Layer-to-layer connections of the complex flowchart, independent of the sources and tools
+_COMPLEX_EDGES = (
+    ("Ingestion Layer", "Landing Zone"),
+    ("Ingestion Layer", "Streaming Layer"),
+    ("Landing Zone", "Data Warehouse"),
+    ("Streaming Layer", "Transformation Layer"),
+    ("Data Warehouse", "Transformation Layer"),
+    ("Transformation Layer", "Feature Store"),
+    ("Transformation Layer", "BI Layer"),
+    ("Feature Store", "Analytics/ML"),
+    ("Analytics/ML", "BI Layer"),
+    ("Streaming Layer", "Monitoring"),
+    ("Transformation Layer", "Monitoring"),
+    ("Landing Zone", "Monitoring"),
+)
+
+# Build the complex flowchart DOT source, once per unique plan
+@st.cache_data(max_entries=128, show_spinner=False)
+def build_complex_dot(sources, ingestion_tool, transformation_tool, visualization_tool):
+    # Data Sources and Layers, grouped by fill colour so each colour is set once as a node default
+    node_groups = {
+        'lightblue': [(f"source_{source}", source) for source in sources],
+        'lightpink': [
+            ("Ingestion Layer", f"{ingestion_tool}\n(Ingestion)"),
+            ("BI Layer", f"{visualization_tool}\n(BI Visualization)"),
+        ],
+        'lightyellow': [
+            ("Landing Zone", "Landing Zone\n(S3 / Blob Storage)"),
+            ("Data Warehouse", "Data Warehouse\n(Redshift / Snowflake)"),
+            ("Streaming Layer", "Streaming Layer\n(Kafka / Flink / KSQL)"),
+            ("Feature Store", "Feature Store\n(ML Features)"),
+        ],
+        'lightgreen': [
+            ("Transformation Layer", f"{transformation_tool}\n(Transformation)"),
+            ("Analytics/ML", "Analytics Layer\n(Data Science & ML)"),
+        ],
+        'orange': [("Monitoring", "Monitoring & Alerts\n(Elastic / Kibana / Grafana)")],
+    }
+    statements = []
+    for fillcolor, nodes in node_groups.items():
+        statements.append(f"node {_dot_attrs({'fillcolor': fillcolor})}")
+        statements += [_dot_node(name, label) for name, label in nodes]
+
+    # Flow from sources, then the fixed layer connections, emitted in one pass
+    # (dict.fromkeys drops repeats, keeping order)
+    edges = dict.fromkeys([(f"source_{source}", "Ingestion Layer") for source in sources] + list(_COMPLEX_EDGES))
+    statements += [_dot_edge(tail, head) for tail, head in edges]
+
+    return _dot_source(_COMPLEX_NODE_ATTR, statements)
+
+# Placeholder plan for drawing the flowchart skeleton before GPT has answered
+SKELETON_PLAN = {category: {"tool": "…"} for category in ("ingestion", "transformation", "visualization")}
+
+# Generate complex flowchart (cached on the canonical sources)
+def generate_complex_flowchart(data_sources, tool_suggestions):
+    return build_complex_dot(
+        canonical_sources(data_sources),
+        tool_suggestions['ingestion']['tool'],
+        tool_suggestions['transformation']['tool'],
+        tool_suggestions['visualization']['tool']
+    )
+
+# Lay out DOT source once with the dot binary, so reruns redisplay the cached SVG
+# (vector output skips rasterizing and is a fraction of the PNG size; the XML prolog is
+# dropped because st.image expects the string to start at <svg)
+@st.cache_data(ttl=4 * 60 * 60, max_entries=128, show_spinner=False)
+def render_svg(dot_source):
+    import graphviz
+    svg = graphviz.Source(dot_source).pipe(format='svg', encoding='utf-8')
+    return svg[svg.index("<svg"):]
+
+# Show a flowchart as a cached SVG, falling back to in-browser layout when the dot binary is missing
+# (graphviz is only needed here, so it is imported on first render)
+def show_flowchart(dot_source):
+    import graphviz
+    try:
+        st.image(render_svg(dot_source))
+    except graphviz.ExecutableNotFound:
+        st.graphviz_chart(dot_source)
+
+# Submit flow shared by the fixed-list apps: generate (or reuse) the result for the inputs and show it
+def run_restricted(client, data_sources, refresh_details):
+    def generate():
+        with st.spinner("Generating suggestions and flowchart..."):
+            return generate_flowchart_and_json(client, data_sources, refresh_details)
+
+    result = reuse_last_result(build_payload(data_sources, refresh_details, variant="restricted"), generate)
+
+    # On failure get_tool_suggestions has already shown the error
+    if result:
+        st.success("✅ Flowchart and JSON generated successfully!")
+        st.subheader("Tool Suggestions (JSON):")
+        st.code(result.json, language="json")
+
+        st.subheader("Flowchart:")
+        show_flowchart(result.graph)